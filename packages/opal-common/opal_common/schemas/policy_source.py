@@ -53,3 +53,7 @@ class BasePolicyScopeSource(BaseSchema):
 
 class GitPolicyScopeSource(BasePolicyScopeSource):
     branch: str = Field("main", description="Git branch to track")
+    shallow: bool = Field(
+        False,
+        description="Whether to clone and fetch only the latest commit of the repo (diff bundles against older commits fall back to complete bundles)",
+    )
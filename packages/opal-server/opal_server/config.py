@@ -280,6 +280,18 @@ class OpalServerConfig(Confi):
 
     SCOPES = confi.bool("SCOPES", default=False)
 
+    SCOPES_FETCH_CONCURRENCY = confi.int(
+        "SCOPES_FETCH_CONCURRENCY",
+        default=10,
+        description="Max number of scope repos (distinct remote urls) fetched concurrently, also the size of the thread pool running git clones and fetches",
+    )
+
+    SCOPES_REPO_CLONE_FILTER = confi.str(
+        "SCOPES_REPO_CLONE_FILTER",
+        default=None,
+        description="Partial clone filter (i.e: 'blob:none') used when cloning scope repos that require no credentials, cuts clone size by skipping historical objects. Blobs missing from commits that predate the clone are fetched at once (under the repo lock) before a diff bundle is made against them, rather than lazily by the git cli (one round-trip per blob)",
+    )
+
     REDIS_URL = confi.str("REDIS_URL", default="redis://localhost")
 
     BASE_DIR = confi.str("BASE_DIR", default=pathlib.Path.home() / ".local/state/opal")
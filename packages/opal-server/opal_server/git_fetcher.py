@@ -1,11 +1,19 @@
+import asyncio
 import hashlib
+import os
 import shutil
+import stat
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional, cast
+from typing import Callable, Dict, List, Optional, Set, TypeVar, Union
+from urllib.parse import urlparse
 
 import aiofiles.os
 import pygit2
-from git import Repo
+from git import GitCommandError, Repo
 from opal_common.async_utils import run_sync
 from opal_common.git.bundle_maker import BundleMaker
 from opal_common.logger import logger
@@ -13,9 +21,11 @@ from opal_common.schemas.policy import PolicyBundle
 from opal_common.schemas.policy_source import (
     GitHubTokenAuthData,
     GitPolicyScopeSource,
+    NoAuthData,
     SSHAuthData,
 )
 from opal_common.synchronization.named_lock import NamedLock
+from opal_server.config import opal_server_config
 from pygit2 import (
     KeypairFromMemory,
     RemoteCallbacks,
@@ -23,9 +33,90 @@ from pygit2 import (
     Username,
     UserPass,
     clone_repository,
-    discover_repository,
 )
 
+T_result = TypeVar("T_result")
+GitCredentials = Union[KeypairFromMemory, UserPass, Username]
+
+# libgit2 only negotiates shallow clones over smart http: upload-pack drops the connection on its
+# shallow requests over stateful transports (git://, ssh), and local clones ignore the depth
+_SHALLOW_CLONE_SCHEMES = frozenset({"http", "https"})
+
+# git network operations (clone, fetch) run on their own bounded thread pool,
+# so they don't compete with other jobs on the event loop's default executor
+_git_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _forget_git_executor():
+    # the pool's threads don't survive a fork (i.e: scopes are preloaded before gunicorn forks workers)
+    global _git_executor
+    _git_executor = None
+
+
+os.register_at_fork(after_in_child=_forget_git_executor)
+
+
+async def _run_git(func: Callable[..., T_result], *args, **kwargs) -> T_result:
+    """like `run_sync`, but runs `func` on the dedicated git thread pool."""
+    global _git_executor
+    if _git_executor is None:
+        _git_executor = ThreadPoolExecutor(
+            max_workers=opal_server_config.SCOPES_FETCH_CONCURRENCY,
+            thread_name_prefix="git-io",
+        )
+    return await asyncio.get_running_loop().run_in_executor(
+        _git_executor, partial(func, *args, **kwargs)
+    )
+
+
+# lock directories known to exist, so we don't re-create them on every fetch
+_created_lock_dirs: Set[Path] = set()
+
+
+async def _ensure_lock_dir(locks_dir: Path):
+    if locks_dir not in _created_lock_dirs:
+        await aiofiles.os.makedirs(str(locks_dir), exist_ok=True)
+        _created_lock_dirs.add(locks_dir)
+
+
+# the event loop only keeps weak references to tasks, so we hold on to the background
+# removals of discarded clones until they are done
+_background_removals: Set["asyncio.Task[None]"] = set()
+
+
+def _on_background_removal_done(task: "asyncio.Task[None]"):
+    _background_removals.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error(
+            "Failed to remove a discarded clone"
+        )
+
+
+def _remove_in_background(path: Path):
+    task = asyncio.create_task(run_sync(shutil.rmtree, path, ignore_errors=True))
+    _background_removals.add(task)
+    task.add_done_callback(_on_background_removal_done)
+
+
+class _InflightSync:
+    """a sync (clone or fetch) running in this process, concurrent callers can
+    piggyback on."""
+
+    def __init__(self):
+        # resolves to whether the remote was cloned or fetched
+        self.done: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        # once set, the sync's view of the remote might predate newer callers
+        self.fetch_started = False
+
+
+# the latest sync of each clone path, running in this process
+_inflight_fetches: Dict[Path, _InflightSync] = {}
+
+
+@lru_cache(maxsize=1024)
+def _url_digest(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
 
 class PolicyFetcherCallbacks:
     async def on_update(self, old_head: Optional[str], head: str):
@@ -62,9 +153,9 @@ class RepoInterface:
                     "Both branch and base branch were not found on remote"
                 )
             logger.debug(
-                f"Created local branch '{branch_name}', pointing to: {commit.hex}"
+                f"Created local branch '{branch_name}', pointing to: {commit.id}"
             )
-            return repo.create_reference(f"refs/heads/{branch_name}", commit.hex)
+            return repo.create_reference(f"refs/heads/{branch_name}", commit.id)
         else:
             logger.debug(
                 f"No need to create local branch '{branch_name}': already exists!"
@@ -79,6 +170,37 @@ class RepoInterface:
         except KeyError:
             return False
 
+    @staticmethod
+    def parse_commit_hash(commit_hash: str) -> Union[str, pygit2.Oid]:
+        """returns the oid of a full commit hash, abbreviated hashes (or any
+        other revspec) are returned as is."""
+        if len(commit_hash) == pygit2.GIT_OID_HEXSZ:
+            try:
+                return pygit2.Oid(hex=commit_hash)
+            except ValueError:
+                pass
+        return commit_hash
+
+    @staticmethod
+    def has_commit(repo: Repository, commit_hash: Union[str, pygit2.Oid]) -> bool:
+        if isinstance(commit_hash, pygit2.Oid):
+            # direct object lookup, no need to parse a revspec (but the oid might not be of a commit)
+            return isinstance(repo.get(commit_hash), pygit2.Commit)
+        try:
+            _ = repo.revparse_single(commit_hash)
+            return True
+        except (KeyError, ValueError):
+            return False
+
+    @staticmethod
+    def resolve_commit_hash(repo: Repository, commit_hash: str) -> Optional[str]:
+        """returns the full hash of the commit referred by `commit_hash` (may
+        be abbreviated), or None if the commit is not found in the repo."""
+        try:
+            return str(repo.revparse_single(commit_hash).peel(pygit2.Commit).id)
+        except (KeyError, ValueError, pygit2.GitError):
+            return None
+
     @staticmethod
     def get_local_branch(repo: Repository, branch: str) -> Optional[pygit2.Reference]:
         try:
@@ -87,13 +209,22 @@ class RepoInterface:
             return None
 
     @staticmethod
-    def get_commit_hash(repo: Repository, branch: str, remote: str) -> Optional[str]:
+    def get_commit_hash(
+        repo: Repository, branch: str, remote: str
+    ) -> Optional[pygit2.Oid]:
         try:
             (commit, _) = repo.resolve_refish(f"{remote}/{branch}")
-            return commit.hex
+            return commit.id
         except (pygit2.GitError, KeyError):
             return None
 
+    @staticmethod
+    def get_commit_hash_str(
+        repo: Repository, branch: str, remote: str
+    ) -> Optional[str]:
+        commit_id = RepoInterface.get_commit_hash(repo, branch, remote)
+        return None if commit_id is None else str(commit_id)
+
     @staticmethod
     def checkout_local_branch_from_remote(
         repo: Repository,
@@ -107,10 +238,15 @@ class RepoInterface:
     def verify_found_repo_matches_remote(
         repo: Repository,
         expected_remote_url: str,
+        remote_name: str,
     ) -> Repository:
         """verifies that the repo we found in the directory matches the repo we
         are wishing to clone."""
-        for remote in repo.remotes:
+        try:
+            remote = repo.remotes[remote_name]
+        except KeyError:
+            pass
+        else:
             if remote.url == expected_remote_url:
                 logger.debug(
                     f"found target repo url is referred by remote: {remote.name}, url={remote.url}"
@@ -132,22 +268,45 @@ class GitPolicyFetcher(PolicyFetcher):
     ):
         super().__init__(callbacks)
         self._base_dir = GitPolicyFetcher.base_dir(base_dir)
+        self._locks_dir = GitPolicyFetcher.locks_dir(base_dir)
         self._source = source
         self._auth_callbacks = GitCallback(self._source)
+        self._source_id = GitPolicyFetcher.source_id(self._source)
         self._repo_path = GitPolicyFetcher.repo_clone_path(base_dir, self._source)
         self._remote = remote_name
         self._scope_id = scope_id
+        # 0 means full history (no depth limit)
+        self._depth = 1 if self._source.shallow else 0
+        self._directory_paths = frozenset(Path(p) for p in self._source.directories)
+        # lazily opened handles of the local clone (see `_get_pygit_repo`, `_get_gitpython_repo`)
+        self._pygit_repo: Optional[Repository] = None
+        self._gitpython_repo: Optional[Repo] = None
+        self._bundle_maker: Optional[BundleMaker] = None
         logger.debug(
-            f"Initializing git fetcher: scope_id={scope_id}, url={source.url}, branch={self._source.branch}, path={GitPolicyFetcher.source_id(source)}"
+            f"Initializing git fetcher: scope_id={scope_id}, url={source.url}, branch={self._source.branch}, path={self._source_id}"
         )
 
+    @classmethod
+    async def ensure_layout(cls, base_dir: Path):
+        """creates the directories shared by all git fetchers (i.e: the repo
+        locks dir), meant to be called once on server startup.
+
+        also removes discarded clones that were left behind (i.e: by a
+        crash or a restart while they were being removed).
+        """
+        await _ensure_lock_dir(cls.locks_dir(base_dir))
+
+        sources_dir = cls.base_dir(base_dir)
+        for name in await run_sync(os.listdir, str(sources_dir)):
+            if name.endswith(".trash"):
+                logger.info(f"Removing leftover discarded clone: {name}")
+                _remove_in_background(sources_dir / name)
+
     async def _get_repo_lock(self):
-        locks_dir = self._base_dir / ".locks"
-        await aiofiles.os.makedirs(str(locks_dir), exist_ok=True)
+        # no-op if the layout was already created (i.e: by `ensure_layout`)
+        await _ensure_lock_dir(self._locks_dir)
 
-        return NamedLock(
-            locks_dir / GitPolicyFetcher.source_id(self._source), attempt_interval=0.1
-        )
+        return NamedLock(self._locks_dir / self._source_id, attempt_interval=0.1)
 
     async def fetch_and_notify_on_changes(
         self, hinted_hash: Optional[str] = None, force_fetch: bool = False
@@ -159,73 +318,301 @@ class GitPolicyFetcher(PolicyFetcher):
         - if after a fetch new commits are detected, a callback will be triggered.
         - if the hinted commit hash is provided and is already found in the local clone
         we use this hint to avoid an necessary fetch.
+        - if the hinted commit hash shows up while we wait for the repo lock, another
+        scope (sharing the same remote) already fetched it, so we don't fetch again.
+        - if the hinted commit hash is found and the local branch is already up to date,
+        there is nothing to fetch nor to write, so we don't take the repo lock at all.
+        - if another scope (sharing the same remote) is already syncing in this process,
+        we wait for its sync instead of fetching again. forced or hinted callers only
+        wait for a sync that didn't start fetching yet, as an earlier fetch might miss
+        the commits they are after.
         """
+        # parsed once, and then looked up directly in the object db
+        hinted_commit = (
+            None
+            if hinted_hash is None
+            else RepoInterface.parse_commit_hash(hinted_hash)
+        )
+        # cheap read-only probe, taken before we (possibly) wait on the lock
+        hinted_hash_found = hinted_commit is not None and await self._has_hinted_hash(
+            hinted_commit
+        )
+        if hinted_hash_found and not force_fetch and self._is_up_to_date():
+            return
+
+        inflight_sync = _inflight_fetches.get(self._repo_path)
+        needs_fresh_fetch = force_fetch or hinted_commit is not None
+        if inflight_sync is not None and not (
+            needs_fresh_fetch and inflight_sync.fetch_started
+        ):
+            logger.debug(f"Waiting for an in-flight fetch of: {self._source.url}")
+            # shielded, so a cancelled waiter doesn't cancel the sync for everyone else
+            fetched_by_other = await asyncio.shield(inflight_sync.done)
+            await self._sync_repo(
+                hinted_commit, force_fetch, hinted_hash_found, fetched_by_other
+            )
+            return
+
+        inflight_sync = _InflightSync()
+        _inflight_fetches[self._repo_path] = inflight_sync
+        fetched = False
+        try:
+            fetched = await self._sync_repo(
+                hinted_commit,
+                force_fetch,
+                hinted_hash_found,
+                fetched_by_other=False,
+                inflight_sync=inflight_sync,
+            )
+        finally:
+            # if we didn't fetch (or failed to), the waiters will fetch by themselves
+            inflight_sync.done.set_result(fetched)
+            if _inflight_fetches.get(self._repo_path) is inflight_sync:
+                del _inflight_fetches[self._repo_path]
+
+    async def _sync_repo(
+        self,
+        hinted_commit: Optional[Union[str, pygit2.Oid]],
+        force_fetch: bool,
+        hinted_hash_found: bool,
+        fetched_by_other: bool,
+        inflight_sync: Optional[_InflightSync] = None,
+    ) -> bool:
+        """clones or fetches the repo (under the repo lock) and notifies on
+        changes, returns whether the remote was cloned or fetched."""
         repo_lock = await self._get_repo_lock()
         async with repo_lock:
-            if self._discover_repository(self._repo_path):
+            if await self._discover_repository(self._repo_path):
                 logger.debug("Repo found at {path}", path=self._repo_path)
                 repo = self._get_valid_repo()
                 if repo is not None:
                     should_fetch = await self._should_fetch(
-                        repo, hinted_hash=hinted_hash, force_fetch=force_fetch
+                        repo,
+                        hinted_hash=hinted_commit,
+                        force_fetch=force_fetch,
+                        hinted_hash_found=hinted_hash_found,
                     )
+                    if fetched_by_other:
+                        # forced or hinted callers only wait for fetches that started after them,
+                        # so the fetch we waited on is as fresh as ours would be
+                        should_fetch = False
                     if should_fetch:
+                        if inflight_sync is not None:
+                            inflight_sync.fetch_started = True
                         logger.debug(
                             f"Fetching remote (force_fetch={force_fetch}): {self._remote} ({self._source.url})"
                         )
-                        await run_sync(
-                            repo.remotes[self._remote].fetch,
-                            callbacks=self._auth_callbacks,
-                        )
+                        await _run_git(self._actual_fetch, repo)
                         logger.debug(f"Fetch completed: {self._source.url}")
 
                     # New commits might be present because of a previous fetch made by another scope
                     await self._notify_on_changes(repo)
-                    return
+                    return should_fetch
                 else:
                     # repo dir exists but invalid -> we must delete the directory
                     logger.warning(
                         "Deleting invalid repo: {path}", path=self._repo_path
                     )
-                    shutil.rmtree(self._repo_path)
+                    await self._discard_repo_dir()
             else:
                 logger.info("Repo not found at {path}", path=self._repo_path)
 
             # fallthrough to clean clone
-            await self._clone()
+            if inflight_sync is not None:
+                inflight_sync.fetch_started = True
+            repo = await self._clone()
+            if repo is not None:
+                await self._notify_on_changes(repo, cloned=True)
+            return repo is not None
+
+    def _actual_fetch(self, repo: Repository):
+        # a shallow source might still have a full clone (see `_clone_repository`)
+        depth = self._depth if repo.is_shallow else 0
+        repo.remotes[self._remote].fetch(callbacks=self._auth_callbacks, depth=depth)
 
-    def _discover_repository(self, path: Path) -> bool:
-        git_path: Path = path / ".git"
-        return discover_repository(str(path)) and git_path.exists()
+    @staticmethod
+    async def batch_fetch(fetchers: List["GitPolicyFetcher"], concurrency: int = 10):
+        """fetches (or clones) the remotes of many scopes concurrently.
 
-    async def _clone(self):
+        fetchers are grouped by their remote url: only the first fetcher
+        in each group actually fetches the remote, the others only check
+        the (already fetched) clone for changes. at most `concurrency`
+        remotes are fetched at the same time.
+        """
+        fetchers_by_source: Dict[str, List[GitPolicyFetcher]] = {}
+        for fetcher in fetchers:
+            fetchers_by_source.setdefault(fetcher._source_id, []).append(fetcher)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def sync_fetcher(fetcher: GitPolicyFetcher, force_fetch: bool):
+            try:
+                await fetcher.fetch_and_notify_on_changes(force_fetch=force_fetch)
+            except Exception as e:
+                logger.exception(
+                    f"Could not fetch policy for scope {fetcher._scope_id}, got error: {e}"
+                )
+
+        async def sync_source(source_fetchers: List[GitPolicyFetcher]):
+            async with semaphore:
+                await sync_fetcher(source_fetchers[0], force_fetch=True)
+            for fetcher in source_fetchers[1:]:
+                # No need to refetch the same repo, just check for changes
+                await sync_fetcher(fetcher, force_fetch=False)
+
+        await asyncio.gather(
+            *[
+                sync_source(source_fetchers)
+                for source_fetchers in fetchers_by_source.values()
+            ]
+        )
+
+    async def _has_hinted_hash(self, hinted_hash: Union[str, pygit2.Oid]) -> bool:
+        """checks (without holding the repo lock) whether the hinted commit is
+        already present in the local clone."""
+        if not await self._discover_repository(self._repo_path):
+            return False
+        try:
+            repo = self._get_pygit_repo()
+        except pygit2.GitError:
+            return False
+        return RepoInterface.has_commit(repo, hinted_hash)
+
+    async def _discard_repo_dir(self):
+        """moves the repo directory out of the way (a cheap rename), and
+        removes it in the background so a large clone won't block the event
+        loop (nor the following re-clone into the same path)."""
+        trash_path = self._repo_path.with_name(
+            f"{self._repo_path.name}.{uuid.uuid4().hex}.trash"
+        )
+        self._forget_repo()
+        await aiofiles.os.rename(str(self._repo_path), str(trash_path))
+        _remove_in_background(trash_path)
+
+    async def _discover_repository(self, path: Path) -> bool:
+        # the repo path is known, no need to discover it (i.e: walk up the parent dirs)
+        try:
+            git_stat = await aiofiles.os.stat(os.path.join(str(path), ".git"))
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        # `.git` might also be a file pointing to the actual git dir (i.e: in a worktree)
+        return stat.S_ISDIR(git_stat.st_mode) or stat.S_ISREG(git_stat.st_mode)
+
+    async def _clone(self) -> Optional[Repository]:
         logger.info(
             "Cloning repo at '{url}' to '{path}'",
             url=self._source.url,
             path=self._repo_path,
         )
+        clone_filter = opal_server_config.SCOPES_REPO_CLONE_FILTER
         try:
-            repo: Repository = await run_sync(
-                clone_repository,
-                self._source.url,
-                str(self._repo_path),
-                callbacks=self._auth_callbacks,
-                checkout_branch=self._source.branch,
-            )
-        except pygit2.GitError:
+            if clone_filter and isinstance(self._source.auth, NoAuthData):
+                repo: Repository = await _run_git(self._partial_clone, clone_filter)
+            else:
+                repo = await _run_git(self._clone_repository)
+        except (pygit2.GitError, GitCommandError):
             logger.exception(
                 f"Could not clone repo at {self._source.url}, checkout branch={self._source.branch}"
             )
+            return None
         else:
             logger.info(f"Clone completed: {self._source.url}")
-            await self.callbacks.on_update(None, repo.head.target.hex)
+            self._pygit_repo = repo
+            return repo
+
+    def _clone_repository(self) -> Repository:
+        depth = self._depth
+        if depth and urlparse(self._source.url).scheme not in _SHALLOW_CLONE_SCHEMES:
+            # the failure to negotiate the shallow clone can't be told apart from any other
+            # network error, so we don't request it over transports that can't negotiate it
+            logger.debug(
+                f"Shallow clones are not supported over this transport, cloning in full: {self._source.url}"
+            )
+            depth = 0
+        return clone_repository(
+            self._source.url,
+            str(self._repo_path),
+            callbacks=self._auth_callbacks,
+            checkout_branch=self._source.branch,
+            depth=depth,
+        )
+
+    def _partial_clone(self, clone_filter: str) -> Repository:
+        """clones the repo with the git cli, as libgit2 does not support
+        partial clones.
+
+        objects left out by the filter are fetched by the git cli (see
+        `_prefetch_missing_blobs`), which is why this is only used for
+        sources that require no credentials.
+        """
+        shallow_options = {}
+        if self._depth:
+            # --depth implies --single-branch, but other scopes may track other branches of this clone
+            shallow_options = dict(depth=self._depth, no_single_branch=True)
+        Repo.clone_from(
+            url=self._source.url,
+            to_path=str(self._repo_path),
+            branch=self._source.branch,
+            filter=clone_filter,
+            env={"GIT_TERMINAL_PROMPT": "0"},
+            **shallow_options,
+        )
+        return Repository(str(self._repo_path))
+
+    def _is_partial_clone(self, repo: Repository) -> bool:
+        promisor_key = f"remote.{self._remote}.promisor"
+        return promisor_key in repo.config and repo.config.get_bool(promisor_key)
+
+    def _find_missing_blobs(self, revision: str) -> List[str]:
+        """lists the blobs of the commit's tree that were left out by the clone
+        filter (without fetching them)."""
+        objects = self._get_gitpython_repo().git.rev_list(
+            "--objects", "--missing=print", "--no-object-names", "--no-walk", revision
+        )
+        return [line[1:] for line in objects.splitlines() if line[:1] == "?"]
+
+    def _prefetch_missing_blobs(self, revision: str):
+        """fetches the missing blobs of the commit's tree all at once.
+
+        otherwise the git cli fetches each missing blob lazily, one
+        round-trip per blob, when the commit is diffed or bundled.
+        """
+        missing_blobs = self._find_missing_blobs(revision)
+        if missing_blobs:
+            self._fetch_blobs(missing_blobs)
+
+    def _fetch_blobs(self, blobs: List[str]):
+        logger.debug(
+            f"Prefetching {len(blobs)} missing blobs of partial clone: {self._source.url}"
+        )
+        with tempfile.TemporaryFile() as wanted_objects:
+            wanted_objects.write("\n".join(blobs).encode())
+            wanted_objects.seek(0)
+            self._get_gitpython_repo().git.execute(
+                [
+                    "git",
+                    "-c",
+                    "fetch.negotiationAlgorithm=noop",
+                    "fetch",
+                    "--no-tags",
+                    "--no-write-fetch-head",
+                    "--recurse-submodules=no",
+                    "--filter=blob:none",
+                    "--stdin",
+                    self._remote,
+                ],
+                istream=wanted_objects,
+                env={"GIT_TERMINAL_PROMPT": "0"},
+            )
 
     def _get_valid_repo(self) -> Optional[Repository]:
         path = str(self._repo_path)
 
         try:
-            repo = Repository(path)
-            RepoInterface.verify_found_repo_matches_remote(repo, self._source.url)
+            repo = self._get_pygit_repo()
+            RepoInterface.verify_found_repo_matches_remote(
+                repo, self._source.url, self._remote
+            )
             return repo
         except pygit2.GitError:
             logger.warning("Invalid repo at: {path}", path=path)
@@ -234,10 +621,17 @@ class GitPolicyFetcher(PolicyFetcher):
     async def _should_fetch(
         self,
         repo: Repository,
-        hinted_hash: Optional[str] = None,
+        hinted_hash: Optional[Union[str, pygit2.Oid]] = None,
         force_fetch: bool = False,
+        hinted_hash_found: bool = False,
     ) -> bool:
-        if force_fetch:
+        """decides whether the remote must be fetched.
+
+        `hinted_hash_found` tells whether the hinted commit was already
+        found before acquiring the repo lock, so we don't probe it
+        again.
+        """
+        if hinted_hash is None and force_fetch:
             return True  # must fetch
 
         if not RepoInterface.has_remote_branch(repo, self._source.branch, self._remote):
@@ -246,21 +640,27 @@ class GitPolicyFetcher(PolicyFetcher):
             )
             return True  # missing branch
 
-        if hinted_hash is not None:
-            try:
-                _ = repo.revparse_single(hinted_hash)
-                return False  # hinted commit was found, no need to fetch
-            except KeyError:
-                logger.info(
-                    "Hinted commit hash was not found in local clone, re-fetching the remote"
-                )
-                return True  # hinted commit was not found
+        if hinted_hash is None:
+            # by default, we try to avoid re-fetching the repo for performance
+            return False
 
-        # by default, we try to avoid re-fetching the repo for performance
-        return False
+        if hinted_hash_found:
+            return force_fetch
 
-    async def _notify_on_changes(self, repo: Repository):
-        # Get the latest commit hash of the target branch
+        if RepoInterface.has_commit(repo, hinted_hash):
+            # double-check: the lock holder we waited on already fetched the hinted commit
+            logger.debug(
+                f"Hinted commit was fetched by another scope, skipping fetch: {hinted_hash}"
+            )
+            return False
+
+        logger.info(
+            "Hinted commit hash was not found in local clone, re-fetching the remote"
+        )
+        return True  # hinted commit was not found
+
+    async def _notify_on_changes(self, repo: Repository, cloned: bool = False):
+        # Get the latest commit id of the target branch (oids are compared as is, and only formatted for the callback)
         new_revision = RepoInterface.get_commit_hash(
             repo, self._source.branch, self._remote
         )
@@ -276,17 +676,70 @@ class GitPolicyFetcher(PolicyFetcher):
             local_branch = RepoInterface.create_local_branch_ref(
                 repo, self._source.branch, self._remote, self._source.branch
             )
+        elif cloned:
+            # the clone already checked out the local branch, but nothing was notified on yet
+            old_revision = None
         else:
-            old_revision = local_branch.target.hex
+            old_revision = local_branch.target
+
+        if old_revision != new_revision:
+            if self._is_partial_clone(repo):
+                try:
+                    await _run_git(self._prefetch_missing_blobs, str(new_revision))
+                except GitCommandError as e:
+                    # not fatal, the update must still be notified (or it is lost, as the local branch may already point at it)
+                    logger.warning(
+                        f"Could not prefetch blobs of {new_revision} (will be fetched lazily): {e}"
+                    )
+            await self.callbacks.on_update(
+                None if old_revision is None else str(old_revision), str(new_revision)
+            )
 
-        await self.callbacks.on_update(old_revision, new_revision)
+            # Bring forward local branch (a bit like "pull"), so we won't detect changes again
+            local_branch.set_target(new_revision)
 
-        # Bring forward local branch (a bit like "pull"), so we won't detect changes again
-        local_branch.set_target(new_revision)
+    def _is_up_to_date(self) -> bool:
+        """returns True if the local branch already points to the head of the
+        target branch (i.e: there are no changes to notify on)."""
+        repo = self._get_pygit_repo()
+        head = RepoInterface.get_commit_hash(repo, self._source.branch, self._remote)
+        local_branch = RepoInterface.get_local_branch(repo, self._source.branch)
+        return (
+            head is not None
+            and local_branch is not None
+            and local_branch.target == head
+        )
+
+    def _get_pygit_repo(self) -> Repository:
+        if self._pygit_repo is None:
+            self._pygit_repo = Repository(str(self._repo_path))
+        return self._pygit_repo
+
+    def _get_gitpython_repo(self) -> Repo:
+        if self._gitpython_repo is None:
+            self._gitpython_repo = Repo(str(self._repo_path))
+        return self._gitpython_repo
+
+    def _get_bundle_maker(self) -> BundleMaker:
+        if self._bundle_maker is None:
+            self._bundle_maker = BundleMaker(
+                self._get_gitpython_repo(),
+                self._directory_paths,
+                extensions=self._source.extensions,
+                root_manifest_path=self._source.manifest,
+                bundle_ignore=self._source.bundle_ignore,
+            )
+        return self._bundle_maker
+
+    def _forget_repo(self):
+        """drops the cached repo handles (i.e: before the clone is deleted)."""
+        self._pygit_repo = None
+        self._gitpython_repo = None
+        self._bundle_maker = None
 
     def _get_current_branch_head(self) -> str:
-        repo = Repository(str(self._repo_path))
-        head_commit_hash = RepoInterface.get_commit_hash(
+        repo = self._get_pygit_repo()
+        head_commit_hash = RepoInterface.get_commit_hash_str(
             repo, self._source.branch, self._remote
         )
         if not head_commit_hash:
@@ -294,58 +747,112 @@ class GitPolicyFetcher(PolicyFetcher):
             raise ValueError("Could not find current branch head")
         return head_commit_hash
 
+    async def prepare_bundle(self, base_hash: Optional[str] = None):
+        """makes sure a partial clone has the blobs needed to make a diff
+        bundle from `base_hash` (see `make_bundle`).
+
+        pygit2 fetches are not filtered, so only commits that predate
+        the clone might miss blobs. those are fetched at once under the
+        repo lock, rather than lazily (one round-trip per blob) by
+        GitPython while the bundle is made without holding the lock.
+        """
+        if not base_hash or not await self._discover_repository(self._repo_path):
+            return
+        repo = self._get_pygit_repo()
+        if not self._is_partial_clone(repo):
+            return
+        base_commit_hash = RepoInterface.resolve_commit_hash(repo, base_hash)
+        if base_commit_hash is None:
+            return
+
+        try:
+            missing_blobs = await _run_git(self._find_missing_blobs, base_commit_hash)
+            if not missing_blobs:
+                return
+            async with await self._get_repo_lock():
+                await _run_git(self._prefetch_missing_blobs, base_commit_hash)
+        except GitCommandError as e:
+            logger.warning(
+                f"Could not prefetch blobs of {base_commit_hash} (will be fetched lazily): {e}"
+            )
+
     def make_bundle(self, base_hash: Optional[str] = None) -> PolicyBundle:
-        repo = Repo(str(self._repo_path))
-        bundle_maker = BundleMaker(
-            repo,
-            {Path(p) for p in self._source.directories},
-            extensions=self._source.extensions,
-            root_manifest_path=self._source.manifest,
-            bundle_ignore=self._source.bundle_ignore,
-        )
+        """makes a complete bundle of the current branch head, or a diff bundle
+        if `base_hash` is provided and found in the local clone.
+
+        commits are resolved with pygit2 (libgit2), so GitPython is only
+        handed full commit hashes and never has to shell out to resolve
+        them (or to fail on an unknown base commit).
+        """
+        repo = self._get_gitpython_repo()
+        bundle_maker = self._get_bundle_maker()
         current_head_commit = repo.commit(self._get_current_branch_head())
 
-        if not base_hash:
+        base_commit_hash = None
+        if base_hash:
+            # base commit might be unknown (or beyond the history of a shallow clone)
+            base_commit_hash = RepoInterface.resolve_commit_hash(
+                self._get_pygit_repo(), base_hash
+            )
+
+        if base_commit_hash is None:
             return bundle_maker.make_bundle(current_head_commit)
         else:
             try:
-                base_commit = repo.commit(base_hash)
+                base_commit = repo.commit(base_commit_hash)
                 return bundle_maker.make_diff_bundle(base_commit, current_head_commit)
-            except ValueError:
+            except (ValueError, GitCommandError):
                 return bundle_maker.make_bundle(current_head_commit)
 
     @staticmethod
     def source_id(source: GitPolicyScopeSource) -> str:
-        return hashlib.sha256(source.url.encode("utf-8")).hexdigest()
+        # the source object itself is not hashable, so we memoize on its url
+        return _url_digest(source.url)
 
     @staticmethod
     def base_dir(base_dir: Path) -> Path:
         return base_dir / "git_sources"
 
+    @staticmethod
+    def locks_dir(base_dir: Path) -> Path:
+        return GitPolicyFetcher.base_dir(base_dir) / ".locks"
+
     @staticmethod
     def repo_clone_path(base_dir: Path, source: GitPolicyScopeSource) -> Path:
-        return GitPolicyFetcher.base_dir(base_dir) / GitPolicyFetcher.source_id(source)
+        return GitPolicyFetcher._repo_clone_path(base_dir, source.url)
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _repo_clone_path(base_dir: Path, url: str) -> Path:
+        return GitPolicyFetcher.base_dir(base_dir) / _url_digest(url)
 
 
 class GitCallback(RemoteCallbacks):
     def __init__(self, source: GitPolicyScopeSource):
         super().__init__()
         self._source = source
+        # resolved once: libgit2 may ask for credentials many times during a single fetch
+        self._cred_builder = GitCallback._get_credentials_builder(self._source.auth)
+        self._cached_credentials: Dict[str, GitCredentials] = {}
 
     def credentials(self, url, username_from_url, allowed_types):
-        if isinstance(self._source.auth, SSHAuthData):
-            auth = cast(SSHAuthData, self._source.auth)
+        credentials = self._cached_credentials.get(username_from_url)
+        if credentials is None:
+            credentials = self._cred_builder(username_from_url)
+            self._cached_credentials[username_from_url] = credentials
+        return credentials
 
-            ssh_key = dict(
-                username=username_from_url,
+    @staticmethod
+    def _get_credentials_builder(auth) -> Callable[[str], GitCredentials]:
+        if isinstance(auth, SSHAuthData):
+            return partial(
+                KeypairFromMemory,
                 pubkey=auth.public_key or "",
                 privkey=auth.private_key,
                 passphrase="",
             )
-            return KeypairFromMemory(**ssh_key)
-        if isinstance(self._source.auth, GitHubTokenAuthData):
-            auth = cast(GitHubTokenAuthData, self._source.auth)
-
-            return UserPass(username="git", password=auth.token)
+        if isinstance(auth, GitHubTokenAuthData):
+            token_credentials = UserPass(username="git", password=auth.token)
+            return lambda username_from_url: token_credentials
 
-        return Username(username_from_url)
+        return Username
@@ -268,6 +268,7 @@ def init_scope_router(
         )
 
         try:
+            await fetcher.prepare_bundle(base_hash)
             return await run_sync(fetcher.make_bundle, base_hash)
         except (InvalidGitRepositoryError, pygit2.GitError, ValueError):
             logger.warning(
@@ -9,7 +9,9 @@ from opal_common.git.commit_viewer import VersionedFile
 from opal_common.logger import logger
 from opal_common.schemas.policy import PolicyUpdateMessageNotification
 from opal_common.schemas.policy_source import GitPolicyScopeSource
+from opal_common.schemas.scopes import Scope
 from opal_common.topics.publisher import ScopedServerSideTopicPublisher
+from opal_server.config import opal_server_config
 from opal_server.git_fetcher import GitPolicyFetcher, PolicyFetcherCallbacks
 from opal_server.policy.watcher.callbacks import (
     create_policy_update,
@@ -117,41 +119,48 @@ class ScopesService:
     ):
         scope = await self._scopes.get(scope_id)
 
+        fetcher = self._create_fetcher(scope, notify_on_changes=notify_on_changes)
+        if fetcher is None:
+            return
+
+        try:
+            await fetcher.fetch_and_notify_on_changes(
+                hinted_hash=hinted_hash,
+                force_fetch=force_fetch,
+            )
+        except Exception as e:
+            logger.exception(
+                f"Could not fetch policy for scope {scope_id}, got error: {e}"
+            )
+
+    def _create_fetcher(
+        self, scope: Scope, notify_on_changes: bool = True
+    ) -> Optional[GitPolicyFetcher]:
         if not isinstance(scope.policy, GitPolicyScopeSource):
             logger.warning("Non-git scopes are currently not supported!")
-            return
+            return None
         source = cast(GitPolicyScopeSource, scope.policy)
 
         logger.info(
-            f"Sync scope: {scope_id} (remote: {source.url}, branch: {source.branch})"
+            f"Sync scope: {scope.scope_id} (remote: {source.url}, branch: {source.branch})"
         )
 
         callbacks = PolicyFetcherCallbacks()
         if notify_on_changes:
             callbacks = NewCommitsCallbacks(
                 base_dir=self._base_dir,
-                scope_id=scope_id,
+                scope_id=scope.scope_id,
                 source=source,
                 pubsub_endpoint=self._pubsub_endpoint,
             )
 
-        fetcher = GitPolicyFetcher(
+        return GitPolicyFetcher(
             self._base_dir,
-            scope_id,
+            scope.scope_id,
             source,
             callbacks=callbacks,
         )
 
-        try:
-            await fetcher.fetch_and_notify_on_changes(
-                hinted_hash=hinted_hash,
-                force_fetch=force_fetch,
-            )
-        except Exception as e:
-            logger.exception(
-                f"Could not fetch policy for scope {scope_id}, got error: {e}"
-            )
-
     async def delete_scope(self, scope_id: str):
         logger.info(f"Delete scope: {scope_id}")
         scope = await self._scopes.get(scope_id)
@@ -186,25 +195,12 @@ class ScopesService:
             f"OPAL Scopes: syncing {len(scopes)} scopes in the background (polling updates: {only_poll_updates})"
         )
 
-        fetched_urls = set()
-        skipped_scopes = []
-        for scope in scopes:
-            # Give priority to scopes that have a unique url (so we'll clone all repos asap)
-            if scope.policy.url in fetched_urls:
-                skipped_scopes.append(scope)
-                continue
-
-            await self.sync_scope(
-                scope.scope_id,
-                force_fetch=True,
-                notify_on_changes=notify_on_changes,
-            )
-            fetched_urls.add(scope.policy.url)
-
-        for scope in skipped_scopes:
-            # No need to refetch the same repo, just check for changes
-            await self.sync_scope(
-                scope.scope_id,
-                force_fetch=False,
-                notify_on_changes=notify_on_changes,
-            )
+        fetchers = [
+            self._create_fetcher(scope, notify_on_changes=notify_on_changes)
+            for scope in scopes
+        ]
+        # Each remote url is fetched once, repos with distinct urls are fetched concurrently
+        await GitPolicyFetcher.batch_fetch(
+            [fetcher for fetcher in fetchers if fetcher is not None],
+            concurrency=opal_server_config.SCOPES_FETCH_CONCURRENCY,
+        )
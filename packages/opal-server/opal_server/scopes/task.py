@@ -5,6 +5,7 @@ from typing import Any
 from fastapi_websocket_pubsub import Topic
 from opal_common.logger import logger
 from opal_server.config import opal_server_config
+from opal_server.git_fetcher import GitPolicyFetcher
 from opal_server.policy.watcher.task import BasePolicyWatcherTask
 from opal_server.redis import RedisDB
 from opal_server.scopes.scope_repository import ScopeRepository
@@ -23,6 +24,7 @@ class ScopesPolicyWatcherTask(BasePolicyWatcherTask):
 
     async def start(self):
         await super().start()
+        await GitPolicyFetcher.ensure_layout(Path(opal_server_config.BASE_DIR))
         self._tasks.append(asyncio.create_task(self._service.sync_scopes()))
 
         if opal_server_config.POLICY_REFRESH_INTERVAL > 0:
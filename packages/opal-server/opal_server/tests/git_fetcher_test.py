@@ -0,0 +1,654 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import pygit2
+import pytest
+import pytest_asyncio
+from git import Actor, GitCommandError, Repo
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from opal_common.schemas.policy_source import GitPolicyScopeSource, NoAuthData
+from opal_common.schemas.scopes import Scope
+from opal_server import git_fetcher
+from opal_server.config import opal_server_config
+from opal_server.git_fetcher import (
+    GitPolicyFetcher,
+    PolicyFetcherCallbacks,
+    RepoInterface,
+)
+from opal_server.scopes.service import ScopesService
+
+
+def make_source(url: str, branch: str = "main", **kwargs) -> GitPolicyScopeSource:
+    return GitPolicyScopeSource(
+        source_type="git", url=url, auth=NoAuthData(), branch=branch, **kwargs
+    )
+
+
+def commit_file(repo: Repo, filename: str, contents: str) -> str:
+    with open(os.path.join(repo.working_tree_dir, filename), "w") as f:
+        f.write(contents)
+    author = Actor("John doe", "john@doe.com")
+    repo.index.add([filename])
+    return repo.index.commit(f"update {filename}", author=author).hexsha
+
+
+@pytest.fixture
+def origin(tmp_path: Path) -> Repo:
+    """a local remote repo, served over file:// (so clone filters apply)."""
+    repo = Repo.init(tmp_path / "origin", initial_branch="main")
+    with repo.config_writer() as config:
+        config.set_value("uploadpack", "allowFilter", "true")
+        config.set_value("uploadpack", "allowAnySHA1InWant", "true")
+    commit_file(repo, "a.rego", "package a\n")
+    return repo
+
+
+def origin_source(origin: Repo) -> GitPolicyScopeSource:
+    return make_source(f"file://{origin.working_tree_dir}")
+
+
+class UpdatesRecorder(PolicyFetcherCallbacks):
+    def __init__(self):
+        self.updates: List[Tuple[Optional[str], str]] = []
+
+    async def on_update(self, old_head: Optional[str], head: str):
+        self.updates.append((old_head, head))
+
+
+class FetchRecorder:
+    """replaces `GitPolicyFetcher.fetch_and_notify_on_changes`, records the
+    calls and how many of them ran at the same time."""
+
+    def __init__(self, failing_scopes=(), delay: float = 0.05):
+        self.calls: List[Tuple[str, bool]] = []
+        self.running = 0
+        self.max_running = 0
+        self._failing_scopes = set(failing_scopes)
+        self._delay = delay
+
+    def install(self, monkeypatch):
+        async def fetch_and_notify_on_changes(
+            fetcher: GitPolicyFetcher, hinted_hash=None, force_fetch=False
+        ):
+            await self.record(fetcher, force_fetch)
+
+        monkeypatch.setattr(
+            GitPolicyFetcher, "fetch_and_notify_on_changes", fetch_and_notify_on_changes
+        )
+        return self
+
+    async def record(self, fetcher: GitPolicyFetcher, force_fetch: bool):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self._delay)
+            self.calls.append((fetcher._scope_id, force_fetch))
+            if fetcher._scope_id in self._failing_scopes:
+                raise RuntimeError(f"failed to fetch {fetcher._scope_id}")
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    return FetchRecorder().install(monkeypatch)
+
+
+def forced_scopes(recorder: FetchRecorder) -> List[str]:
+    return sorted(scope_id for scope_id, force_fetch in recorder.calls if force_fetch)
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_forces_one_fetch_per_url(tmp_path: Path, recorder):
+    fetchers = [
+        GitPolicyFetcher(tmp_path, "a1", make_source("file:///repos/a")),
+        GitPolicyFetcher(tmp_path, "b1", make_source("file:///repos/b")),
+        GitPolicyFetcher(tmp_path, "a2", make_source("file:///repos/a", "dev")),
+        GitPolicyFetcher(tmp_path, "a3", make_source("file:///repos/a")),
+    ]
+
+    await GitPolicyFetcher.batch_fetch(fetchers)
+
+    assert sorted(scope_id for scope_id, _ in recorder.calls) == [
+        "a1",
+        "a2",
+        "a3",
+        "b1",
+    ]
+    # the first scope of each url fetches, the others only check for changes
+    assert forced_scopes(recorder) == ["a1", "b1"]
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_bounds_concurrent_fetches(tmp_path: Path, recorder):
+    fetchers = [
+        GitPolicyFetcher(tmp_path, f"s{i}", make_source(f"file:///repos/{i}"))
+        for i in range(6)
+    ]
+
+    await GitPolicyFetcher.batch_fetch(fetchers, concurrency=2)
+
+    assert len(recorder.calls) == 6
+    assert recorder.max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_failure_does_not_cancel_other_scopes(
+    tmp_path: Path, monkeypatch
+):
+    recorder = FetchRecorder(failing_scopes={"a1", "b2"}).install(monkeypatch)
+    fetchers = [
+        GitPolicyFetcher(tmp_path, "a1", make_source("file:///repos/a")),
+        GitPolicyFetcher(tmp_path, "a2", make_source("file:///repos/a")),
+        GitPolicyFetcher(tmp_path, "b1", make_source("file:///repos/b")),
+        GitPolicyFetcher(tmp_path, "b2", make_source("file:///repos/b")),
+        GitPolicyFetcher(tmp_path, "c1", make_source("file:///repos/c")),
+    ]
+
+    await GitPolicyFetcher.batch_fetch(fetchers)
+
+    assert sorted(scope_id for scope_id, _ in recorder.calls) == [
+        "a1",
+        "a2",
+        "b1",
+        "b2",
+        "c1",
+    ]
+
+
+class InMemoryScopes:
+    def __init__(self, scopes: List[Scope]):
+        self._scopes = scopes
+
+    async def all(self) -> List[Scope]:
+        return self._scopes
+
+
+@pytest.mark.asyncio
+async def test_sync_scopes_batches_fetches(tmp_path: Path, recorder):
+    scopes = InMemoryScopes(
+        [
+            Scope(scope_id="a1", policy=make_source("file:///repos/a")),
+            Scope(
+                scope_id="a2",
+                policy=make_source("file:///repos/a", poll_updates=True),
+            ),
+            Scope(
+                scope_id="b1",
+                policy=make_source("file:///repos/b", poll_updates=True),
+            ),
+        ]
+    )
+    service = ScopesService(tmp_path, scopes, pubsub_endpoint=None)
+
+    await service.sync_scopes(notify_on_changes=False)
+    assert sorted(scope_id for scope_id, _ in recorder.calls) == ["a1", "a2", "b1"]
+    assert forced_scopes(recorder) == ["a1", "b1"]
+
+    recorder.calls.clear()
+    await service.sync_scopes(only_poll_updates=True, notify_on_changes=False)
+    assert sorted(recorder.calls) == [("a2", True), ("b1", True)]
+
+
+def missing_objects(repo: Repo, revision: str) -> List[str]:
+    objects = repo.git.rev_list("--objects", "--missing=print", "--no-walk", revision)
+    return [line for line in objects.splitlines() if line.startswith("?")]
+
+
+@pytest.mark.asyncio
+async def test_partial_clone_prefetches_blobs_of_bundle_base(
+    tmp_path: Path, origin: Repo, monkeypatch
+):
+    monkeypatch.setattr(opal_server_config, "SCOPES_REPO_CLONE_FILTER", "blob:none")
+    base_dir = tmp_path / "base"
+    source = origin_source(origin)
+    old_head = origin.head.commit.hexsha
+    commit_file(origin, "a.rego", "package a\n\nallow = true\n")
+    new_head = commit_file(origin, "b.rego", "package b\n")
+
+    fetcher = GitPolicyFetcher(base_dir, "s", source)
+    await fetcher.fetch_and_notify_on_changes()
+    clone = Repo(GitPolicyFetcher.repo_clone_path(base_dir, source))
+    assert clone.git.config("remote.origin.promisor") == "true"
+    # commits that predate the clone are left without their blobs
+    assert missing_objects(clone, old_head) != []
+
+    await fetcher.prepare_bundle(old_head)
+
+    assert missing_objects(clone, old_head) == []
+    bundle = fetcher.make_bundle(old_head)
+    assert (bundle.old_hash, bundle.hash) == (old_head, new_head)
+    assert sorted(bundle.manifest) == ["a.rego", "b.rego"]
+
+
+@pytest.mark.asyncio
+async def test_partial_clone_notifies_update_when_prefetch_fails(
+    tmp_path: Path, origin: Repo, monkeypatch
+):
+    monkeypatch.setattr(opal_server_config, "SCOPES_REPO_CLONE_FILTER", "blob:none")
+    base_dir = tmp_path / "base"
+    source = origin_source(origin)
+    callbacks = UpdatesRecorder()
+    fetcher = GitPolicyFetcher(base_dir, "s", source, callbacks=callbacks)
+    await fetcher.fetch_and_notify_on_changes()
+    old_head = origin.head.commit.hexsha
+    new_head = commit_file(origin, "b.rego", "package b\n")
+
+    def fail_prefetch(self, revision: str):
+        raise GitCommandError("fetch", 128)
+
+    monkeypatch.setattr(GitPolicyFetcher, "_prefetch_missing_blobs", fail_prefetch)
+    await fetcher.fetch_and_notify_on_changes(force_fetch=True)
+
+    assert callbacks.updates == [(None, old_head), (old_head, new_head)]
+    assert clone_head(base_dir, origin) == new_head
+
+
+@pytest.fixture
+def http_origin(tmp_path: Path, origin: Repo) -> Iterator[str]:
+    """serves the origin repo over smart http (with `git http-backend`),
+    returns its url."""
+
+    def app(environ, start_response):
+        body = environ["wsgi.input"].read(int(environ.get("CONTENT_LENGTH") or 0))
+        env = dict(
+            os.environ,
+            GIT_PROJECT_ROOT=str(tmp_path),
+            GIT_HTTP_EXPORT_ALL="1",
+            PATH_INFO=environ["PATH_INFO"],
+            QUERY_STRING=environ.get("QUERY_STRING", ""),
+            REQUEST_METHOD=environ["REQUEST_METHOD"],
+            CONTENT_TYPE=environ.get("CONTENT_TYPE", ""),
+            CONTENT_LENGTH=str(len(body)),
+        )
+        output = subprocess.run(
+            ["git", "http-backend"], input=body, env=env, capture_output=True
+        ).stdout
+        headers, _, payload = output.partition(b"\r\n\r\n")
+        status, response_headers = "200 OK", []
+        for header in headers.decode().split("\r\n"):
+            name, _, value = header.partition(": ")
+            if name.lower() == "status":
+                status = value
+            elif name:
+                response_headers.append((name, value))
+        start_response(status, response_headers)
+        return [payload]
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/origin"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def history_length(base_dir: Path, source: GitPolicyScopeSource) -> int:
+    clone = Repo(GitPolicyFetcher.repo_clone_path(base_dir, source))
+    return int(clone.git.rev_list("--count", "HEAD"))
+
+
+@pytest.mark.asyncio
+async def test_shallow_clone_and_fetch_over_http(
+    tmp_path: Path, origin: Repo, http_origin: str
+):
+    base_dir = tmp_path / "base"
+    old_head = commit_file(origin, "b.rego", "package b\n")
+    source = make_source(http_origin, shallow=True)
+    callbacks = UpdatesRecorder()
+    fetcher = GitPolicyFetcher(base_dir, "s", source, callbacks=callbacks)
+
+    await fetcher.fetch_and_notify_on_changes()
+    clone_path = GitPolicyFetcher.repo_clone_path(base_dir, source)
+    assert pygit2.Repository(str(clone_path)).is_shallow
+    assert history_length(base_dir, source) == 1
+
+    new_head = commit_file(origin, "c.rego", "package c\n")
+    await fetcher.fetch_and_notify_on_changes(force_fetch=True)
+
+    assert pygit2.Repository(str(clone_path)).is_shallow
+    assert callbacks.updates == [(None, old_head), (old_head, new_head)]
+
+
+@pytest.mark.asyncio
+async def test_shallow_source_is_cloned_in_full_over_local_transport(
+    tmp_path: Path, origin: Repo, monkeypatch
+):
+    base_dir = tmp_path / "base"
+    commit_file(origin, "b.rego", "package b\n")
+    source = make_source(f"file://{origin.working_tree_dir}", shallow=True)
+    depths = []
+    actual_clone_repository = git_fetcher.clone_repository
+
+    def clone_repository(*args, depth: int = 0, **kwargs):
+        depths.append(depth)
+        return actual_clone_repository(*args, depth=depth, **kwargs)
+
+    monkeypatch.setattr(git_fetcher, "clone_repository", clone_repository)
+    await GitPolicyFetcher(base_dir, "s", source).fetch_and_notify_on_changes()
+
+    # a single (full) clone, libgit2 can't make it shallow over this transport
+    assert depths == [0]
+    clone_path = GitPolicyFetcher.repo_clone_path(base_dir, source)
+    assert not pygit2.Repository(str(clone_path)).is_shallow
+    assert history_length(base_dir, source) == 2
+
+
+def test_has_commit_only_finds_commits(origin: Repo):
+    repo = pygit2.Repository(origin.working_tree_dir)
+    commit = origin.head.commit
+
+    assert RepoInterface.has_commit(
+        repo, RepoInterface.parse_commit_hash(commit.hexsha)
+    )
+    assert RepoInterface.has_commit(repo, commit.hexsha[:10])
+    # objects other than commits (i.e: a tree) are not a found commit
+    tree_oid = RepoInterface.parse_commit_hash(commit.tree.hexsha)
+    assert isinstance(tree_oid, pygit2.Oid)
+    assert not RepoInterface.has_commit(repo, tree_oid)
+    assert not RepoInterface.has_commit(repo, RepoInterface.parse_commit_hash("1" * 40))
+
+
+class ControlledFetches:
+    """wraps `GitPolicyFetcher._actual_fetch`: counts the fetches, holds the
+    first one (after it fetched) until released, and fails the `fail_fetch`-th
+    one."""
+
+    def __init__(self, monkeypatch, fail_fetch: Optional[int] = None):
+        self.count = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+        actual_fetch = GitPolicyFetcher._actual_fetch
+
+        def fetch(fetcher: GitPolicyFetcher, repo: pygit2.Repository):
+            with self._lock:
+                self.count += 1
+                number = self.count
+            if number == fail_fetch:
+                raise pygit2.GitError("failed to fetch")
+            actual_fetch(fetcher, repo)
+            if number == 1:
+                self.started.set()
+                self.release.wait(timeout=10)
+
+        monkeypatch.setattr(GitPolicyFetcher, "_actual_fetch", fetch)
+
+    async def wait_started(self):
+        while not self.started.is_set():
+            await asyncio.sleep(0.01)
+
+
+async def start_waiters(*coros) -> List[asyncio.Task]:
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    # let them reach the in-flight fetch they wait on
+    await asyncio.sleep(0.2)
+    return tasks
+
+
+async def sync_after_held_fetch(
+    fetches: ControlledFetches,
+    owner: GitPolicyFetcher,
+    *waiters,
+    cancel_waiter: Optional[int] = None,
+) -> list:
+    """runs the waiters while the owner's fetch is held (cancelling the
+    `cancel_waiter`-th one), then releases it."""
+    owner_task = asyncio.create_task(
+        owner.fetch_and_notify_on_changes(force_fetch=True)
+    )
+    await fetches.wait_started()
+    waiter_tasks = await start_waiters(*waiters)
+    if cancel_waiter is not None:
+        waiter_tasks[cancel_waiter].cancel()
+        await asyncio.sleep(0.05)
+    fetches.release.set()
+    return await asyncio.gather(owner_task, *waiter_tasks, return_exceptions=True)
+
+
+@pytest_asyncio.fixture
+async def cloned_origin(tmp_path: Path, origin: Repo) -> Tuple[Path, Repo]:
+    base_dir = tmp_path / "base"
+    await GitPolicyFetcher(
+        base_dir, "s", origin_source(origin)
+    ).fetch_and_notify_on_changes()
+    return base_dir, origin
+
+
+@pytest.mark.asyncio
+async def test_clone_notifies_head_once(tmp_path: Path, origin: Repo):
+    callbacks = UpdatesRecorder()
+    fetcher = GitPolicyFetcher(
+        tmp_path / "base", "s", origin_source(origin), callbacks=callbacks
+    )
+
+    await fetcher.fetch_and_notify_on_changes()
+    assert callbacks.updates == [(None, origin.head.commit.hexsha)]
+
+    # nothing changed since the clone
+    await fetcher.fetch_and_notify_on_changes(force_fetch=True)
+    assert callbacks.updates == [(None, origin.head.commit.hexsha)]
+
+
+def clone_head(base_dir: Path, origin: Repo) -> str:
+    clone = pygit2.Repository(
+        str(GitPolicyFetcher.repo_clone_path(base_dir, origin_source(origin)))
+    )
+    return RepoInterface.get_commit_hash_str(clone, "main", "origin")
+
+
+def record_repo_locks(monkeypatch) -> List[str]:
+    """records the scopes taking the repo lock."""
+    locking_scopes = []
+    actual_get_repo_lock = GitPolicyFetcher._get_repo_lock
+
+    async def _get_repo_lock(fetcher: GitPolicyFetcher):
+        locking_scopes.append(fetcher._scope_id)
+        return await actual_get_repo_lock(fetcher)
+
+    monkeypatch.setattr(GitPolicyFetcher, "_get_repo_lock", _get_repo_lock)
+    return locking_scopes
+
+
+@pytest.mark.asyncio
+async def test_hinted_sync_of_up_to_date_clone_skips_lock(cloned_origin, monkeypatch):
+    base_dir, origin = cloned_origin
+    locking_scopes = record_repo_locks(monkeypatch)
+    callbacks = UpdatesRecorder()
+    fetcher = GitPolicyFetcher(
+        base_dir, "webhook", origin_source(origin), callbacks=callbacks
+    )
+
+    await fetcher.fetch_and_notify_on_changes(hinted_hash=origin.head.commit.hexsha)
+
+    assert locking_scopes == []
+    assert callbacks.updates == []
+
+
+@pytest.mark.asyncio
+async def test_hinted_sync_notifies_found_commit_not_notified_yet(
+    cloned_origin, monkeypatch
+):
+    base_dir, origin = cloned_origin
+    old_head = origin.head.commit.hexsha
+    new_head = commit_file(origin, "b.rego", "package b\n")
+    clone = pygit2.Repository(
+        str(GitPolicyFetcher.repo_clone_path(base_dir, origin_source(origin)))
+    )
+    # the remote branch moves (i.e: by a fetch of another process), the local one doesn't
+    clone.remotes["origin"].fetch()
+    fetches = ControlledFetches(monkeypatch)
+    locking_scopes = record_repo_locks(monkeypatch)
+    callbacks = UpdatesRecorder()
+    fetcher = GitPolicyFetcher(
+        base_dir, "webhook", origin_source(origin), callbacks=callbacks
+    )
+
+    await fetcher.fetch_and_notify_on_changes(hinted_hash=new_head)
+
+    assert locking_scopes == ["webhook"]
+    assert fetches.count == 0
+    assert callbacks.updates == [(old_head, new_head)]
+    assert str(RepoInterface.get_local_branch(clone, "main").target) == new_head
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hinted", [False, True])
+async def test_concurrent_syncs_of_same_url_fetch_once(
+    cloned_origin, monkeypatch, hinted: bool
+):
+    base_dir, origin = cloned_origin
+    fetches = ControlledFetches(monkeypatch)
+    fetches.release.set()
+    old_head = origin.head.commit.hexsha
+    new_head = commit_file(origin, "b.rego", "package b\n")
+    hinted_hash = new_head if hinted else None
+    callbacks = [UpdatesRecorder() for _ in range(5)]
+
+    await asyncio.gather(
+        *[
+            GitPolicyFetcher(
+                base_dir, f"s{i}", origin_source(origin), callbacks=callbacks[i]
+            ).fetch_and_notify_on_changes(hinted_hash=hinted_hash, force_fetch=True)
+            for i in range(5)
+        ]
+    )
+
+    assert fetches.count == 1
+    assert clone_head(base_dir, origin) == new_head
+    # the local branch is shared, so the change is notified once
+    assert [update for c in callbacks for update in c.updates] == [(old_head, new_head)]
+
+
+@pytest.mark.asyncio
+async def test_hinted_waiter_fetches_commit_pushed_after_inflight_fetch(
+    cloned_origin, monkeypatch
+):
+    base_dir, origin = cloned_origin
+    fetches = ControlledFetches(monkeypatch)
+    polled_head = commit_file(origin, "b.rego", "package b\n")
+    owner = GitPolicyFetcher(base_dir, "poll", origin_source(origin))
+
+    owner_task = asyncio.create_task(
+        owner.fetch_and_notify_on_changes(force_fetch=True)
+    )
+    await fetches.wait_started()
+    # pushed after the in-flight fetch already fetched, a webhook hints on it
+    pushed_head = commit_file(origin, "c.rego", "package c\n")
+    callbacks = UpdatesRecorder()
+    webhook = GitPolicyFetcher(
+        base_dir, "webhook", origin_source(origin), callbacks=callbacks
+    )
+    (waiter_task,) = await start_waiters(
+        webhook.fetch_and_notify_on_changes(hinted_hash=pushed_head)
+    )
+    fetches.release.set()
+    await asyncio.gather(owner_task, waiter_task)
+
+    assert fetches.count == 2
+    assert clone_head(base_dir, origin) == pushed_head
+    assert callbacks.updates == [(polled_head, pushed_head)]
+
+
+@pytest.mark.asyncio
+async def test_forced_waiter_fetches_commit_pushed_after_inflight_fetch(
+    cloned_origin, monkeypatch
+):
+    base_dir, origin = cloned_origin
+    fetches = ControlledFetches(monkeypatch)
+    polled_head = commit_file(origin, "b.rego", "package b\n")
+    owner = GitPolicyFetcher(base_dir, "poll", origin_source(origin))
+
+    owner_task = asyncio.create_task(
+        owner.fetch_and_notify_on_changes(force_fetch=True)
+    )
+    await fetches.wait_started()
+    # pushed after the in-flight fetch already fetched, an unhinted sync is forced
+    pushed_head = commit_file(origin, "c.rego", "package c\n")
+    callbacks = UpdatesRecorder()
+    forced = GitPolicyFetcher(
+        base_dir, "forced", origin_source(origin), callbacks=callbacks
+    )
+    (waiter_task,) = await start_waiters(
+        forced.fetch_and_notify_on_changes(force_fetch=True)
+    )
+    fetches.release.set()
+    await asyncio.gather(owner_task, waiter_task)
+
+    assert fetches.count == 2
+    assert clone_head(base_dir, origin) == pushed_head
+    assert callbacks.updates == [(polled_head, pushed_head)]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_inflight_fetch(
+    cloned_origin, monkeypatch
+):
+    base_dir, origin = cloned_origin
+    fetches = ControlledFetches(monkeypatch)
+    new_head = commit_file(origin, "b.rego", "package b\n")
+
+    # s1 syncs after the owner's fetch, s2 and s3 wait for s1's sync
+    results = await sync_after_held_fetch(
+        fetches,
+        GitPolicyFetcher(base_dir, "s0", origin_source(origin)),
+        *[
+            GitPolicyFetcher(
+                base_dir, f"s{i}", origin_source(origin)
+            ).fetch_and_notify_on_changes(force_fetch=True)
+            for i in range(1, 4)
+        ],
+        cancel_waiter=1,
+    )
+
+    assert results[0] is None and results[1] is None and results[3] is None
+    assert isinstance(results[2], asyncio.CancelledError)
+    # the remaining waiter still piggybacked on s1's fetch
+    assert fetches.count == 2
+    assert clone_head(base_dir, origin) == new_head
+
+
+@pytest.mark.asyncio
+async def test_waiters_fetch_by_themselves_when_inflight_fetch_fails(
+    cloned_origin, monkeypatch
+):
+    base_dir, origin = cloned_origin
+    fetches = ControlledFetches(monkeypatch, fail_fetch=2)
+    new_head = commit_file(origin, "b.rego", "package b\n")
+
+    # s1 syncs after the owner's fetch (and fails), s2 and s3 wait for s1's sync
+    results = await sync_after_held_fetch(
+        fetches,
+        GitPolicyFetcher(base_dir, "s0", origin_source(origin)),
+        *[
+            GitPolicyFetcher(
+                base_dir, f"s{i}", origin_source(origin)
+            ).fetch_and_notify_on_changes(force_fetch=True)
+            for i in range(1, 4)
+        ],
+    )
+
+    assert results[0] is None
+    assert isinstance(results[1], pygit2.GitError)
+    assert results[2:] == [None, None]
+    # each waiter fell back to its own fetch
+    assert fetches.count == 4
+    assert clone_head(base_dir, origin) == new_head